@@ -1,13 +1,32 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from datetime import datetime
+from typing import List, Optional
 import uuid
 import os
 
+from app.services import profiler
+from app.services.ml_simulator import build_analysis_payload
+from app.services.work_queue import DONE, FAILED, JobState, ResultPoller, open_queue
+from app.utils.responses import FastJSONResponse, negotiated_response, negotiated_stream
+
+ALLOWED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.dcm')
+
+# Queue mode: with XRAY_QUEUE_URL set this node only accepts and enqueues
+# uploads, and `python -m app.worker` processes run the inference.
+QUEUE_URL = os.getenv("XRAY_QUEUE_URL")
+RESULT_TIMEOUT = float(os.getenv("XRAY_RESULT_TIMEOUT", "30"))
+work_queue = open_queue(QUEUE_URL) if QUEUE_URL else None
+# One poller per API worker process serves every waiting request
+result_poller = ResultPoller(work_queue, run_sync=run_in_threadpool) if work_queue else None
+
 app = FastAPI(
     title="X-ray ML Analysis Research API",
     description="FOR RESEARCH USE ONLY - NOT FOR CLINICAL DIAGNOSIS",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -19,8 +38,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create uploads directory
-os.makedirs("uploads", exist_ok=True)
+# Create uploads directory (queue mode keeps no local state)
+if work_queue is None:
+    os.makedirs("uploads", exist_ok=True)
 
 @app.get("/")
 async def root():
@@ -34,33 +54,125 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+def _job_body(analysis_id: str, state: Optional[JobState]) -> dict:
+    if state is not None and state.status == DONE:
+        return state.result
+    if state is not None and state.status == FAILED:
+        return {"analysis_id": analysis_id, "status": "error", "progress": 100, "detail": state.error}
+    return {"analysis_id": analysis_id, "status": "processing", "progress": 0}
+
+def _job_response(analysis_id: str, state: Optional[JobState], accept: Optional[str]):
+    body = _job_body(analysis_id, state)
+    if body["status"] == "error":
+        raise HTTPException(status_code=500, detail=body["detail"])
+    status_code = 200 if body["status"] == "success" else 202
+    return negotiated_response(body, accept, status_code=status_code)
+
+async def _enqueue(analysis_id: str, upload: UploadFile) -> None:
+    content = await upload.read()
+    await run_in_threadpool(work_queue.enqueue, analysis_id, upload.filename, content)
+
 @app.post("/api/analyze")
-async def analyze_xray(file: UploadFile = File(...)):
+async def analyze_xray(request: Request, file: UploadFile = File(...), wait: bool = True):
     # Validate file type
-    if not file.filename.lower().endswith(('.jpg', '.jpeg', '.png', '.dcm')):
+    if not file.filename.lower().endswith(ALLOWED_EXTENSIONS):
         raise HTTPException(status_code=400, detail="Invalid file type")
     
     # Generate analysis ID
     analysis_id = str(uuid.uuid4())
-    
-    return {
-        "analysis_id": analysis_id,
-        "status": "success",
-        "progress": 100,
-        "results": {
-            "conditions": [
-                {"name": "No significant findings", "confidence": 0.92},
-                {"name": "Pneumonia", "confidence": 0.07}
-            ],
-            "findings": [
-                "Lungs are clear and well expanded",
-                "No pleural effusion or pneumothorax"
-            ],
-            "confidence_score": 0.92,
-            "model_version": "Research Model v1.0"
-        },
-        "timestamp": datetime.utcnow().isoformat()
-    }
+    accept = request.headers.get("accept")
+
+    if work_queue is None:
+        return negotiated_response(build_analysis_payload(analysis_id), accept)
+
+    # Queue mode: return 202 straight away (wait=false) or once the timeout
+    # passes; the client then polls GET /api/analyze/{analysis_id}.
+    await _enqueue(analysis_id, file)
+    state = await result_poller.wait(analysis_id, RESULT_TIMEOUT) if wait else None
+    return _job_response(analysis_id, state, accept)
+
+@app.get("/api/analyze/{analysis_id}")
+async def get_analysis(request: Request, analysis_id: str):
+    if work_queue is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    state = await run_in_threadpool(work_queue.get, analysis_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return _job_response(analysis_id, state, request.headers.get("accept"))
+
+@app.post("/api/analyze/batch")
+async def analyze_xray_batch(request: Request, files: List[UploadFile] = File(...)):
+    """Stream one result per file as NDJSON (or MessagePack via Accept).
+
+    In queue mode results are streamed in completion order as workers
+    finish them, so every line carries its ``filename``.
+    """
+    accept = request.headers.get("accept")
+    invalid = [{"filename": f.filename, "status": "error", "detail": "Invalid file type"}
+               for f in files if not f.filename.lower().endswith(ALLOWED_EXTENSIONS)]
+    valid = [(str(uuid.uuid4()), f) for f in files if f.filename.lower().endswith(ALLOWED_EXTENSIONS)]
+    filenames = {analysis_id: upload.filename for analysis_id, upload in valid}
+
+    if work_queue is None:
+        def results():
+            yield from invalid
+            for analysis_id, upload in valid:
+                payload = build_analysis_payload(analysis_id)
+                payload["filename"] = upload.filename
+                yield payload
+
+        return negotiated_stream(results(), accept)
+
+    # Enqueue before returning: the uploads are closed once the endpoint exits
+    for analysis_id, upload in valid:
+        await _enqueue(analysis_id, upload)
+
+    async def queued_results():
+        for item in invalid:
+            yield item
+        async for analysis_id, state in result_poller.iter_results(list(filenames), RESULT_TIMEOUT):
+            payload = _job_body(analysis_id, state)
+            payload["filename"] = filenames[analysis_id]
+            yield payload
+
+    return negotiated_stream(queued_results(), accept)
+
+# Debug profiling routes (opt-in via XRAY_PROFILING, never registered otherwise)
+if profiler.PROFILING_ENABLED:
+    @app.get("/debug/profile")
+    async def debug_profile(seconds: float = 10.0, format: str = "speedscope"):
+        if format not in ("speedscope", "collapsed"):
+            raise HTTPException(status_code=400, detail="format must be 'speedscope' or 'collapsed'")
+        try:
+            capture = await run_in_threadpool(profiler.sampling_profiler.capture, seconds)
+        except profiler.ProfilerBusyError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+        # Only the worker process that served this request is sampled; the
+        # pid tells repeated calls against `uvicorn --workers N` apart.
+        pid = os.getpid()
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        headers = {
+            "X-Profiled-Pid": str(pid),
+            "X-Tracemalloc-Active": str(profiler.allocation_tracker.active).lower(),
+        }
+        if format == "collapsed":
+            headers["Content-Disposition"] = f'attachment; filename="profile-{pid}-{stamp}.folded"'
+            return PlainTextResponse(profiler.to_collapsed(capture), headers=headers)
+        headers["Content-Disposition"] = f'attachment; filename="profile-{pid}-{stamp}.speedscope.json"'
+        return FastJSONResponse(profiler.to_speedscope(capture, name=f"xray-api pid {pid}"), headers=headers)
+
+    @app.get("/debug/allocations")
+    async def debug_allocations(limit: int = 20):
+        # tracemalloc starts on the first call and stays on until stopped
+        result = await run_in_threadpool(profiler.allocation_tracker.diff, limit)
+        result["pid"] = os.getpid()
+        return result
+
+    @app.delete("/debug/allocations")
+    async def stop_allocation_tracking():
+        await run_in_threadpool(profiler.allocation_tracker.stop)
+        return {"tracing": False, "pid": os.getpid()}
 
 if __name__ == "__main__":
     import uvicorn
@@ -2,6 +2,34 @@ import random
 from datetime import datetime
 from app.models.analysis import AnalysisResults, Condition
 
+# Results returned by the API's simulated analysis. Built once at import
+# and shared by every response so serialization is the only per-request
+# cost. It must never be mutated: callers that need to edit the results of
+# a payload should use copy.deepcopy(payload["results"]) first.
+SIMULATED_RESULTS = {
+    "conditions": [
+        {"name": "No significant findings", "confidence": 0.92},
+        {"name": "Pneumonia", "confidence": 0.07}
+    ],
+    "findings": [
+        "Lungs are clear and well expanded",
+        "No pleural effusion or pneumothorax"
+    ],
+    "confidence_score": 0.92,
+    "model_version": "Research Model v1.0"
+}
+
+
+def build_analysis_payload(analysis_id: str) -> dict:
+    """Return the analysis response body as plain dicts, ready to encode."""
+    return {
+        "analysis_id": analysis_id,
+        "status": "success",
+        "progress": 100,
+        "results": SIMULATED_RESULTS,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 class MLSimulator:
     def simulate_analysis(self, analysis_id: str, image_info: dict):
         conditions = [
@@ -0,0 +1,200 @@
+"""Opt-in runtime profiling for the API workers.
+
+Nothing in this module runs unless ``XRAY_PROFILING`` is set: the debug
+routes are only registered when ``PROFILING_ENABLED`` is true. The sampler
+reads ``sys._current_frames()`` only for the duration of a capture, and
+tracemalloc is only started by the first allocation diff and can be
+stopped again, so CPU captures are not skewed by allocation tracing.
+Both only see the process that serves the request.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+PROFILING_ENABLED = os.getenv("XRAY_PROFILING", "").lower() in ("1", "true", "yes")
+TRACEMALLOC_FRAMES = int(os.getenv("XRAY_TRACEMALLOC_FRAMES", "10"))
+
+MAX_PROFILE_SECONDS = 60.0
+DEFAULT_INTERVAL = 0.005
+
+Frame = Tuple[str, str, int]
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a capture is requested while another one is running."""
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler over every thread in the process."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def capture(self, seconds: float) -> Dict:
+        """Sample all threads for ``seconds`` and return aggregated stacks.
+
+        Blocks the calling thread; run it off the event loop so the
+        requests being profiled keep being served.
+        """
+        seconds = max(0.0, min(seconds, MAX_PROFILE_SECONDS))
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile capture is already running")
+        try:
+            return self._sample(seconds)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float) -> Dict:
+        own_thread = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = [("thread " + names.get(thread_id, str(thread_id)), "", 0)]
+                stack.extend(_walk_stack(frame))
+                stacks[tuple(stack)] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        return {
+            "stacks": stacks,
+            "samples": samples,
+            "interval": self.interval,
+            "duration": time.perf_counter() - started,
+        }
+
+
+def _walk_stack(frame) -> List[Frame]:
+    """Return the frames of ``frame`` ordered root first."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    if not filename:
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def to_collapsed(profile: Dict) -> str:
+    """Render a capture in the folded format read by flamegraph.pl."""
+    lines = []
+    for stack, count in profile["stacks"].most_common():
+        lines.append(";".join(_frame_label(f) for f in stack) + f" {count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(profile: Dict, name: str = "xray-api") -> Dict:
+    """Render a capture as a speedscope sampled profile."""
+    frames: List[Dict] = []
+    index: Dict[Frame, int] = {}
+    samples = []
+    weights = []
+    # Each sample costs more than the nominal interval (frame walking,
+    # thread enumeration, sleep jitter), so weight by the measured period.
+    period = profile["duration"] / profile["samples"] if profile["samples"] else profile["interval"]
+
+    for stack, count in profile["stacks"].items():
+        indices = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                entry = {"name": frame[0]}
+                if frame[1]:
+                    entry["file"] = frame[1]
+                    entry["line"] = frame[2]
+                frames.append(entry)
+            indices.append(index[frame])
+        samples.append(indices)
+        weights.append(count * period)
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "xray-ml-platform",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+class AllocationTracker:
+    """Diff tracemalloc snapshots taken between successive calls."""
+
+    def __init__(self, frames: int = TRACEMALLOC_FRAMES):
+        self.frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._previous = None
+
+    def diff(self, limit: int = 20) -> Dict:
+        """Return the top allocation deltas since the previous call.
+
+        The first call starts tracemalloc if needed and only records a
+        baseline, so bracket the requests of interest with two calls.
+        """
+        self.start()
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        with self._lock:
+            previous, self._previous = self._previous, snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        result = {"traced_bytes": current, "peak_bytes": peak, "baseline": previous is None, "top": []}
+        if previous is None:
+            return result
+
+        for stat in snapshot.compare_to(previous, "lineno")[:limit]:
+            frame = stat.traceback[0]
+            result["top"].append({
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            })
+        return result
+
+
+sampling_profiler = SamplingProfiler()
+allocation_tracker = AllocationTracker()
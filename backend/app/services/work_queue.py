@@ -0,0 +1,315 @@
+"""Shared work queue between stateless API nodes and inference workers.
+
+API nodes only ``enqueue`` uploads; workers (``python -m app.worker``) ``claim``
+batches, run inference and ``complete`` each job. The originating request
+waits on the node's ``ResultPoller``. Backends are selected by URL scheme,
+so another broker can be plugged in with ``register_queue_backend``.
+
+The bundled SQLite backend runs in WAL mode, which relies on shared memory:
+the API and every worker must run on the same host, and the database must
+not live on a network filesystem (NFS, SMB). Multi-host deployments need a
+networked broker registered with ``register_queue_backend``.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    job_id: str
+    filename: str
+    payload: bytes
+    attempts: int
+
+
+@dataclass
+class JobState:
+    job_id: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class WorkQueue(ABC):
+    """Interface every queue backend implements."""
+
+    @abstractmethod
+    def enqueue(self, job_id: str, filename: str, payload: bytes) -> None:
+        """Add a job; ``payload`` is the raw upload so workers need no shared disk."""
+
+    @abstractmethod
+    def claim(self, worker_id: str, max_items: int = 8, lease_seconds: float = 60.0) -> List[Job]:
+        """Lease up to ``max_items`` jobs. Expired leases are handed out again."""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Publish the result of a job back to the requester.
+
+        Only the worker currently holding the lease may finish a job;
+        returns False if the lease was lost (expired, re-claimed or failed).
+        """
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Mark a job as failed with ``error``; same lease rules as ``complete``."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[JobState]:
+        """Return the current state of a job, or None if it is unknown."""
+
+    @abstractmethod
+    def get_many(self, job_ids: Iterable[str]) -> Dict[str, JobState]:
+        """Return the states of the known jobs among ``job_ids``."""
+
+    @abstractmethod
+    def purge(self, older_than_seconds: float) -> int:
+        """Delete finished jobs older than ``older_than_seconds``; return the count."""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Queue stored in a single SQLite database file (WAL mode).
+
+    Single host only: every process must open the file from local disk.
+    A connection is opened per operation, so one instance can be shared by
+    threads and each worker process can open its own.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    payload BLOB,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, created)")
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def enqueue(self, job_id: str, filename: str, payload: bytes) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, filename, payload, status, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, filename, payload, QUEUED, now, now),
+            )
+
+    def claim(self, worker_id: str, max_items: int = 8, lease_seconds: float = 60.0) -> List[Job]:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            # IMMEDIATE takes the write lock up front so two workers never
+            # select the same rows.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose lease ran out too many times are given up on
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, payload = NULL, updated = ? "
+                    "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                    (FAILED, "Exceeded maximum attempts", now, RUNNING, now, self.max_attempts),
+                )
+                rows = conn.execute(
+                    "SELECT job_id, filename, payload, attempts FROM jobs "
+                    "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                    "ORDER BY created LIMIT ?",
+                    (QUEUED, RUNNING, now, max_items),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE jobs SET status = ?, worker_id = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated = ? WHERE job_id = ?",
+                    [(RUNNING, worker_id, now + lease_seconds, now, row[0]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return [Job(job_id=r[0], filename=r[1], payload=r[2], attempts=r[3] + 1) for r in rows]
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return self._finish(job_id, worker_id, DONE, result=json.dumps(result))
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._finish(job_id, worker_id, FAILED, error=error)
+
+    def _finish(self, job_id: str, worker_id: str, status: str,
+                result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, "
+                "lease_expires = NULL, updated = ? WHERE job_id = ? AND worker_id = ? AND status = ?",
+                (status, result, error, time.time(), job_id, worker_id, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[JobState]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT status, result, error FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, result, error = row
+        return JobState(job_id=job_id, status=status, result=json.loads(result) if result else None, error=error)
+
+    def get_many(self, job_ids: Iterable[str]) -> Dict[str, JobState]:
+        job_ids = list(job_ids)
+        states = {}
+        with closing(self._connect()) as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT job_id, status, result, error FROM jobs WHERE job_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for job_id, status, result, error in rows:
+                    states[job_id] = JobState(job_id=job_id, status=status,
+                                              result=json.loads(result) if result else None, error=error)
+        return states
+
+    def purge(self, older_than_seconds: float) -> int:
+        cutoff = time.time() - older_than_seconds
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, cutoff)
+            )
+            return cursor.rowcount
+
+
+QUEUE_BACKENDS: Dict[str, Callable[[str], WorkQueue]] = {
+    "sqlite": lambda location: SQLiteWorkQueue(location),
+}
+
+
+def register_queue_backend(scheme: str, factory: Callable[[str], WorkQueue]) -> None:
+    """Make ``open_queue`` understand ``<scheme>://...`` URLs."""
+    QUEUE_BACKENDS[scheme] = factory
+
+
+def open_queue(url: str) -> WorkQueue:
+    """Open a queue from a URL such as ``sqlite:///var/lib/xray/queue.db``.
+
+    For the SQLite backend the location is the database path, so
+    ``sqlite:///data/queue.db`` is absolute and ``sqlite://queue.db`` is
+    relative to the working directory.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unsupported queue backend '{parsed.scheme}'. Known: {', '.join(QUEUE_BACKENDS)}")
+    return QUEUE_BACKENDS[parsed.scheme](parsed.netloc + parsed.path)
+
+
+class ResultPoller:
+    """One poller per API node that resolves every waiting request.
+
+    Requests register the job ids they wait for; a single background task
+    fetches all of them with one ``get_many`` per tick and resolves the
+    waiters as jobs finish, so the query rate does not grow with the number
+    of requests in flight. ``run_sync`` runs the blocking queue call off the
+    event loop; the API passes Starlette's ``run_in_threadpool``.
+    """
+
+    def __init__(self, queue: WorkQueue, poll_interval: float = 0.05,
+                 run_sync: Optional[Callable[..., Awaitable[Any]]] = None):
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self._run_sync = run_sync or asyncio.to_thread
+        self._waiters: Dict[str, List["asyncio.Future[Optional[JobState]]"]] = {}
+        self._latest: Dict[str, JobState] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.polls = 0
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[JobState]:
+        """Wait until the job finishes or ``timeout`` passes; return its last state."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, []).append(future)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return self._latest.get(job_id)
+        finally:
+            self._forget(job_id, future)
+
+    async def iter_results(self, job_ids: Iterable[str],
+                           timeout: float) -> AsyncIterator[Tuple[str, Optional[JobState]]]:
+        """Yield ``(job_id, state)`` for each job as soon as it finishes.
+
+        Jobs still unfinished after ``timeout`` are yielded with their last
+        known state.
+        """
+        async def one(job_id: str) -> Tuple[str, Optional[JobState]]:
+            return job_id, await self.wait(job_id, timeout)
+
+        for next_done in asyncio.as_completed([one(job_id) for job_id in job_ids]):
+            yield await next_done
+
+    def _forget(self, job_id: str, future: "asyncio.Future[Optional[JobState]]") -> None:
+        futures = self._waiters.get(job_id)
+        if futures and future in futures:
+            futures.remove(future)
+            if not futures:
+                del self._waiters[job_id]
+        if job_id not in self._waiters:
+            self._latest.pop(job_id, None)
+
+    async def _poll(self) -> None:
+        while self._waiters:
+            try:
+                states = await self._run_sync(self.queue.get_many, list(self._waiters))
+            except Exception as exc:
+                # Fail the current waiters instead of leaving them hanging
+                for futures in self._waiters.values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(exc)
+                self._waiters.clear()
+                self._latest.clear()
+                return
+            self.polls += 1
+            for job_id, futures in list(self._waiters.items()):
+                state = states.get(job_id)
+                if state is not None:
+                    self._latest[job_id] = state
+                if state is None or state.finished:
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(state)
+            await asyncio.sleep(self.poll_interval)
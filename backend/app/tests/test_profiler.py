@@ -0,0 +1,99 @@
+import threading
+import time
+import tracemalloc
+import unittest
+from collections import Counter
+
+from backend.app.services.profiler import (
+    AllocationTracker,
+    ProfilerBusyError,
+    SamplingProfiler,
+    to_collapsed,
+    to_speedscope,
+)
+
+
+def _capture():
+    stacks = Counter({
+        (("thread MainThread", "", 0), ("main", "/srv/app.py", 10), ("handler", "/srv/api.py", 42)): 3,
+        (("thread MainThread", "", 0), ("main", "/srv/app.py", 10)): 1,
+    })
+    return {"stacks": stacks, "samples": 4, "interval": 0.005, "duration": 0.2}
+
+
+class ProfileFormatTests(unittest.TestCase):
+    def test_collapsed_output(self):
+        lines = to_collapsed(_capture()).splitlines()
+        self.assertEqual(lines, [
+            "thread MainThread;main (app.py:10);handler (api.py:42) 3",
+            "thread MainThread;main (app.py:10) 1",
+        ])
+
+    def test_speedscope_frames_samples_and_weights(self):
+        doc = to_speedscope(_capture(), name="test")
+        frames = doc["shared"]["frames"]
+        self.assertEqual([f["name"] for f in frames], ["thread MainThread", "main", "handler"])
+        self.assertNotIn("file", frames[0])
+        self.assertEqual(frames[2], {"name": "handler", "file": "/srv/api.py", "line": 42})
+
+        profile = doc["profiles"][0]
+        self.assertEqual(profile["samples"], [[0, 1, 2], [0, 1]])
+        # Weighted by the measured period (0.2s / 4 samples), not the nominal interval
+        for weight, expected in zip(profile["weights"], [0.15, 0.05]):
+            self.assertAlmostEqual(weight, expected)
+        self.assertAlmostEqual(profile["endValue"], 0.2)
+
+
+class SamplingProfilerTests(unittest.TestCase):
+    def test_capture_samples_other_threads(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=stop.wait, name="sleeper")
+        worker.start()
+        try:
+            capture = SamplingProfiler(interval=0.001).capture(0.05)
+        finally:
+            stop.set()
+            worker.join()
+        self.assertGreater(capture["samples"], 0)
+        self.assertTrue(any(stack[0][0] == "thread sleeper" for stack in capture["stacks"]))
+
+    def test_concurrent_capture_is_rejected(self):
+        profiler = SamplingProfiler(interval=0.001)
+        worker = threading.Thread(target=profiler.capture, args=(0.3,))
+        worker.start()
+        try:
+            time.sleep(0.05)
+            with self.assertRaises(ProfilerBusyError):
+                profiler.capture(0.01)
+        finally:
+            worker.join()
+
+
+class AllocationTrackerTests(unittest.TestCase):
+    def setUp(self):
+        self.was_tracing = tracemalloc.is_tracing()
+        self.tracker = AllocationTracker(frames=1)
+        self.tracker.start()
+
+    def tearDown(self):
+        if not self.was_tracing:
+            self.tracker.stop()
+
+    def test_first_call_records_baseline_then_diffs(self):
+        first = self.tracker.diff()
+        self.assertTrue(first["baseline"])
+        self.assertEqual(first["top"], [])
+
+        retained = [str(i) * 10 for i in range(5000)]
+        second = self.tracker.diff(limit=5)
+        self.assertFalse(second["baseline"])
+        self.assertTrue(any(entry["size_diff"] > 0 for entry in second["top"]))
+        self.assertEqual(len(retained), 5000)
+
+    def test_diff_starts_tracing_lazily_and_stop_ends_it(self):
+        self.tracker.stop()
+        self.assertFalse(self.tracker.active)
+        self.assertTrue(self.tracker.diff()["baseline"])
+        self.assertTrue(self.tracker.active)
+        self.tracker.stop()
+        self.assertFalse(tracemalloc.is_tracing())
@@ -0,0 +1,81 @@
+import json
+import unittest
+from datetime import datetime
+from enum import Enum
+from unittest import mock
+
+from backend.app.utils import serialization
+from backend.app.utils.serialization import dumps_json, iter_ndjson, wants_msgpack
+
+
+class Status(str, Enum):
+    SUCCESS = "success"
+
+
+PAYLOAD = {
+    "analysis_id": "abc",
+    "status": Status.SUCCESS,
+    "results": {"conditions": [{"name": "Pneumonia", "confidence": 0.07}]},
+    "timestamp": datetime(2024, 1, 2, 3, 4, 5),
+}
+
+
+class ContentNegotiationTests(unittest.TestCase):
+    def setUp(self):
+        # Negotiation only depends on msgpack being importable
+        patcher = mock.patch.object(serialization, "msgpack", object())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_msgpack_media_types(self):
+        self.assertTrue(wants_msgpack("application/msgpack"))
+        self.assertTrue(wants_msgpack("application/x-msgpack"))
+        self.assertFalse(wants_msgpack("application/json"))
+        self.assertFalse(wants_msgpack(None))
+        self.assertFalse(wants_msgpack("*/*"))
+
+    def test_q_values(self):
+        self.assertTrue(wants_msgpack("application/json;q=0.5, application/msgpack"))
+        self.assertFalse(wants_msgpack("application/json, application/msgpack;q=0.9"))
+        self.assertFalse(wants_msgpack("application/msgpack;q=0"))
+        self.assertFalse(wants_msgpack("application/msgpack;q=bogus"))
+
+    def test_ties_go_to_first_listed(self):
+        self.assertTrue(wants_msgpack("application/msgpack, application/json"))
+        self.assertFalse(wants_msgpack("application/x-ndjson, application/msgpack"))
+
+    def test_falls_back_to_json_without_msgpack(self):
+        with mock.patch.object(serialization, "msgpack", None):
+            self.assertFalse(wants_msgpack("application/msgpack"))
+            with self.assertRaises(RuntimeError):
+                serialization.dumps_msgpack(PAYLOAD)
+
+
+class EncoderTests(unittest.TestCase):
+    def test_stdlib_fallback_matches_fast_path(self):
+        expected = {
+            "analysis_id": "abc",
+            "status": "success",
+            "results": {"conditions": [{"name": "Pneumonia", "confidence": 0.07}]},
+            "timestamp": "2024-01-02T03:04:05",
+        }
+        with mock.patch.object(serialization, "orjson", None):
+            fallback = dumps_json(PAYLOAD)
+        self.assertEqual(json.loads(fallback), expected)
+        self.assertNotIn(b" ", fallback.replace(b"Pneumonia", b""))
+        self.assertEqual(json.loads(dumps_json(PAYLOAD)), expected)
+
+    def test_unknown_types_raise(self):
+        with mock.patch.object(serialization, "orjson", None):
+            with self.assertRaises(TypeError):
+                dumps_json({"value": object()})
+
+    def test_ndjson_lines(self):
+        lines = list(iter_ndjson([{"a": 1}, {"b": datetime(2024, 1, 1)}]))
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(all(line.endswith(b"\n") and line.count(b"\n") == 1 for line in lines))
+        self.assertEqual(json.loads(lines[1]), {"b": "2024-01-01T00:00:00"})
+
+
+if __name__ == '__main__':
+    unittest.main()
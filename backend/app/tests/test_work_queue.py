@@ -0,0 +1,176 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from backend.app.services.work_queue import (
+    DONE,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    ResultPoller,
+    SQLiteWorkQueue,
+    open_queue,
+)
+
+
+class SQLiteWorkQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = SQLiteWorkQueue(os.path.join(self.tmp.name, "queue.db"), max_attempts=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _enqueue(self, count):
+        for i in range(count):
+            self.queue.enqueue(f"job{i}", f"{i}.png", b"image")
+
+    def test_claims_are_exclusive_and_fifo(self):
+        self._enqueue(5)
+        first = self.queue.claim("w1", max_items=3)
+        second = self.queue.claim("w2", max_items=3)
+        self.assertEqual([j.job_id for j in first], ["job0", "job1", "job2"])
+        self.assertEqual([j.job_id for j in second], ["job3", "job4"])
+        self.assertEqual(first[0].payload, b"image")
+        self.assertEqual(first[0].attempts, 1)
+        self.assertEqual(self.queue.claim("w3"), [])
+        self.assertEqual(self.queue.get("job0").status, RUNNING)
+
+    def test_complete_publishes_result(self):
+        self._enqueue(1)
+        job, = self.queue.claim("w1")
+        self.assertTrue(self.queue.complete(job.job_id, "w1", {"status": "success"}))
+        state = self.queue.get("job0")
+        self.assertEqual((state.status, state.result), (DONE, {"status": "success"}))
+        self.assertTrue(state.finished)
+        self.assertIsNone(self.queue.get("missing"))
+
+    def test_expired_lease_is_reclaimed_and_stale_worker_rejected(self):
+        self._enqueue(1)
+        self.queue.claim("w1", lease_seconds=0.01)
+        time.sleep(0.05)
+        job, = self.queue.claim("w2")
+        self.assertEqual(job.attempts, 2)
+
+        self.assertFalse(self.queue.complete("job0", "w1", {"from": "w1"}))
+        self.assertTrue(self.queue.complete("job0", "w2", {"from": "w2"}))
+        self.assertFalse(self.queue.fail("job0", "w2", "late"))
+        self.assertEqual(self.queue.get("job0").result, {"from": "w2"})
+
+    def test_max_attempts_marks_job_failed(self):
+        self._enqueue(1)
+        for worker in ("w1", "w2"):
+            self.assertEqual(len(self.queue.claim(worker, lease_seconds=0.01)), 1)
+            time.sleep(0.05)
+        self.assertEqual(self.queue.claim("w3"), [])
+
+        state = self.queue.get("job0")
+        self.assertEqual((state.status, state.error), (FAILED, "Exceeded maximum attempts"))
+        # The worker that held the last lease can no longer overwrite the failure
+        self.assertFalse(self.queue.complete("job0", "w2", {"status": "success"}))
+        self.assertEqual(self.queue.get("job0").status, FAILED)
+
+    def test_get_many_and_purge(self):
+        self._enqueue(3)
+        for job in self.queue.claim("w1", max_items=2):
+            self.queue.complete(job.job_id, "w1", {})
+        states = self.queue.get_many(["job0", "job1", "job2", "missing"])
+        self.assertEqual({k: v.status for k, v in states.items()},
+                         {"job0": DONE, "job1": DONE, "job2": QUEUED})
+
+        self.assertEqual(self.queue.purge(3600), 0)
+        self.assertEqual(self.queue.purge(0), 2)
+        self.assertEqual(list(self.queue.get_many(["job0", "job2"])), ["job2"])
+
+
+class ResultPollerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = SQLiteWorkQueue(os.path.join(self.tmp.name, "queue.db"))
+        for i in range(3):
+            self.queue.enqueue(f"job{i}", f"{i}.png", b"image")
+        self.queue.claim("w1", max_items=3)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_concurrent_waits_share_one_query_per_tick(self):
+        poller = ResultPoller(self.queue, poll_interval=0.01)
+
+        async def run():
+            waits = [asyncio.create_task(poller.wait(f"job{i % 3}", timeout=1.0)) for i in range(30)]
+            await asyncio.sleep(0.05)
+            for i in range(3):
+                self.queue.complete(f"job{i}", "w1", {"n": i})
+            return await asyncio.gather(*waits)
+
+        started = time.monotonic()
+        states = asyncio.run(run())
+        ticks = (time.monotonic() - started) / poller.poll_interval
+        self.assertEqual([s.result["n"] for s in states], [i % 3 for i in range(30)])
+        # 30 waiters polling on their own would make ~30 queries per tick
+        self.assertLessEqual(poller.polls, ticks + 1)
+        self.assertEqual(poller._waiters, {})
+
+    def test_wait_times_out_with_last_state(self):
+        poller = ResultPoller(self.queue, poll_interval=0.01)
+        state = asyncio.run(poller.wait("job0", timeout=0.05))
+        self.assertEqual(state.status, RUNNING)
+        self.assertEqual(poller._latest, {})
+
+    def test_unknown_job_resolves_to_none(self):
+        poller = ResultPoller(self.queue, poll_interval=0.01)
+        self.assertIsNone(asyncio.run(poller.wait("missing", timeout=1.0)))
+
+    def test_iter_results_yields_in_completion_order(self):
+        poller = ResultPoller(self.queue, poll_interval=0.01)
+        self.queue.complete("job2", "w1", {"n": 2})
+
+        async def collect():
+            seen = []
+            async for job_id, state in poller.iter_results(["job0", "job1", "job2"], timeout=1.0):
+                seen.append((job_id, state.status))
+                if job_id == "job2":
+                    self.queue.complete("job0", "w1", {"n": 0})
+            return seen
+
+        seen = asyncio.run(collect())
+        self.assertEqual(seen[:2], [("job2", DONE), ("job0", DONE)])
+        # job1 never finished and is reported with its last state at the timeout
+        self.assertEqual(seen[2], ("job1", RUNNING))
+
+    def test_queue_errors_reach_waiters(self):
+        def broken(job_ids):
+            raise RuntimeError("database is locked")
+
+        self.queue.get_many = broken
+        poller = ResultPoller(self.queue, poll_interval=0.01)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(poller.wait("job0", timeout=1.0))
+
+
+class OpenQueueTests(unittest.TestCase):
+    def test_sqlite_urls(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "nested", "queue.db")
+            queue = open_queue(f"sqlite://{path}")
+            self.assertIsInstance(queue, SQLiteWorkQueue)
+            self.assertEqual(queue.path, path)
+            self.assertTrue(os.path.exists(path))
+
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                self.assertEqual(open_queue("sqlite://relative.db").path, "relative.db")
+            finally:
+                os.chdir(cwd)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            open_queue("redis://localhost:6379/0")
+
+
+if __name__ == '__main__':
+    unittest.main()
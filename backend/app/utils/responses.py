@@ -0,0 +1,51 @@
+"""Response classes backed by the encoders in ``serialization``."""
+from typing import Any, AsyncIterable, Iterable, Optional, Union
+
+from fastapi.responses import Response, StreamingResponse
+
+from app.utils.serialization import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    aiter_msgpack,
+    aiter_ndjson,
+    dumps_json,
+    dumps_msgpack,
+    iter_msgpack,
+    iter_ndjson,
+    wants_msgpack,
+)
+
+
+class FastJSONResponse(Response):
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps_msgpack(content)
+
+
+def negotiated_response(content: Any, accept: Optional[str], status_code: int = 200) -> Response:
+    """Return MessagePack if the client asked for it, JSON otherwise."""
+    response_class = MsgPackResponse if wants_msgpack(accept) else FastJSONResponse
+    return response_class(content, status_code=status_code, headers={"Vary": "Accept"})
+
+
+def negotiated_stream(items: Union[Iterable[Any], AsyncIterable[Any]], accept: Optional[str]) -> StreamingResponse:
+    """Stream ``items`` as NDJSON, or as concatenated MessagePack objects.
+
+    ``items`` may be an async iterable, in which case each item is sent as
+    soon as it is produced.
+    """
+    is_async = hasattr(items, "__aiter__")
+    if wants_msgpack(accept):
+        body = aiter_msgpack(items) if is_async else iter_msgpack(items)
+        return StreamingResponse(body, media_type=MSGPACK_MEDIA_TYPE, headers={"Vary": "Accept"})
+    body = aiter_ndjson(items) if is_async else iter_ndjson(items)
+    return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE, headers={"Vary": "Accept"})
@@ -0,0 +1,101 @@
+"""Fast encoders for analysis results.
+
+orjson is used for JSON when it is installed and MessagePack is offered as
+a compact binary alternative; both fall back gracefully so the API still
+works with only the standard library. This module has no FastAPI imports so
+the encoders can be benchmarked on their own.
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary format
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def _default(obj: Any) -> Any:
+    """Encode the few non-primitive types that appear in responses."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(obj: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed. Run `pip install msgpack`.")
+    return msgpack.packb(obj, default=_default, use_bin_type=True, datetime=False)
+
+
+def iter_ndjson(items: Iterable[Any]) -> Iterator[bytes]:
+    """Yield one newline-terminated JSON document per item."""
+    for item in items:
+        yield dumps_json(item) + b"\n"
+
+
+def iter_msgpack(items: Iterable[Any]) -> Iterator[bytes]:
+    """Yield concatenated MessagePack objects, readable with ``msgpack.Unpacker``."""
+    for item in items:
+        yield dumps_msgpack(item)
+
+
+async def aiter_ndjson(items: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    """Async counterpart of ``iter_ndjson`` for results produced as they complete."""
+    async for item in items:
+        yield dumps_json(item) + b"\n"
+
+
+async def aiter_msgpack(items: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    async for item in items:
+        yield dumps_msgpack(item)
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Return True if the Accept header prefers MessagePack over JSON.
+
+    MessagePack is only chosen when the library is available; otherwise the
+    client gets JSON, which every client can read. On equal q-values the
+    type listed first wins, and wildcards fall back to JSON.
+    """
+    if msgpack is None or not accept:
+        return False
+
+    best_type, best_q = None, 0.0
+    for part in accept.split(","):
+        fields = [f.strip() for f in part.split(";")]
+        media_type = fields[0].lower()
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type in MSGPACK_MEDIA_TYPES or media_type in (JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE):
+            if q > best_q:
+                best_type, best_q = media_type, q
+    return best_type in MSGPACK_MEDIA_TYPES
@@ -0,0 +1,90 @@
+"""Inference worker pool that drains the shared work queue.
+
+Run one or more of these on the same host as the API nodes when using the
+bundled SQLite queue (workers on other hosts need a networked backend, see
+``register_queue_backend``):
+
+    python -m app.worker --queue sqlite:///srv/xray/queue.db --processes 4
+
+API nodes started with the same ``XRAY_QUEUE_URL`` only enqueue uploads,
+so inference capacity scales independently of the HTTP front-ends.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+
+from app.services.ml_simulator import build_analysis_payload
+from app.services.work_queue import Job, WorkQueue, open_queue
+
+
+def analyze_job(job: Job) -> dict:
+    """Run inference on one queued upload and return the response body."""
+    return build_analysis_payload(job.job_id)
+
+
+def process_batch(queue: WorkQueue, worker_id: str, jobs) -> None:
+    for job in jobs:
+        try:
+            finished = queue.complete(job.job_id, worker_id, analyze_job(job))
+        except Exception as e:
+            finished = queue.fail(job.job_id, worker_id, str(e))
+        if not finished:
+            print(f"⚠️  Lease on {job.job_id} was lost; result discarded")
+
+
+def run_worker(queue_url: str, batch_size: int = 8, poll_interval: float = 0.1,
+               lease_seconds: float = 60.0, retention_seconds: float = 3600.0) -> None:
+    queue = open_queue(queue_url)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    last_purge = time.monotonic()
+    print(f"🔧 Worker {worker_id} polling {queue_url}")
+
+    while True:
+        jobs = queue.claim(worker_id, max_items=batch_size, lease_seconds=lease_seconds)
+        if jobs:
+            process_batch(queue, worker_id, jobs)
+        else:
+            time.sleep(poll_interval)
+
+        if time.monotonic() - last_purge > retention_seconds:
+            queue.purge(retention_seconds)
+            last_purge = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="X-ray inference worker")
+    parser.add_argument("--queue", default=os.getenv("XRAY_QUEUE_URL"), help="Queue URL, e.g. sqlite:///srv/xray/queue.db")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes to start")
+    parser.add_argument("--batch-size", type=int, default=8, help="Jobs claimed per poll")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="Seconds to sleep when the queue is empty")
+    parser.add_argument("--lease-seconds", type=float, default=60.0, help="Time before an unfinished job is retried")
+    parser.add_argument("--retention-seconds", type=float, default=3600.0, help="How long finished results are kept")
+    args = parser.parse_args()
+
+    if not args.queue:
+        parser.error("--queue or XRAY_QUEUE_URL is required")
+
+    # Create the schema once before the pool starts
+    open_queue(args.queue)
+
+    worker_args = (args.queue, args.batch_size, args.poll_interval, args.lease_seconds, args.retention_seconds)
+    if args.processes <= 1:
+        run_worker(*worker_args)
+        return
+
+    processes = [multiprocessing.Process(target=run_worker, args=worker_args, daemon=True)
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
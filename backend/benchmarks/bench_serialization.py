@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compare response encoders on realistic analysis payloads.
+
+Run from the backend directory:
+
+    python benchmarks/bench_serialization.py --batch-size 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+
+# Make the ``app`` package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ml_simulator import build_analysis_payload
+from app.utils import serialization
+
+
+def stdlib_json(obj):
+    return json.dumps(obj).encode("utf-8")
+
+
+def stdlib_ndjson(items):
+    return b"".join(json.dumps(item).encode("utf-8") + b"\n" for item in items)
+
+
+def make_batch(size):
+    batch = []
+    for i in range(size):
+        payload = build_analysis_payload(str(uuid.uuid4()))
+        payload["filename"] = f"person{i}_bacteria_{i}.jpeg"
+        batch.append(payload)
+    return batch
+
+
+def encoders():
+    yield "json (stdlib)", stdlib_json, stdlib_ndjson
+    if serialization.orjson is not None:
+        yield "orjson", serialization.dumps_json, lambda items: b"".join(serialization.iter_ndjson(items))
+    else:
+        print("ℹ️  orjson not installed, skipping")
+    if serialization.msgpack is not None:
+        yield "msgpack", serialization.dumps_msgpack, lambda items: b"".join(serialization.iter_msgpack(items))
+    else:
+        print("ℹ️  msgpack not installed, skipping")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analysis response encoders")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Results per batch/NDJSON stream")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    single = build_analysis_payload(str(uuid.uuid4()))
+    batch = make_batch(args.batch_size)
+    single_loops = 10000
+
+    print(f"{'encoder':<16}{'single (us)':>14}{'single (B)':>12}{'batch (ms)':>14}{'batch (KB)':>12}")
+    print("-" * 68)
+    for name, encode_one, encode_many in encoders():
+        single_time = min(timeit.repeat(lambda: encode_one(single), number=single_loops, repeat=args.repeat))
+        batch_time = min(timeit.repeat(lambda: encode_many(batch), number=1, repeat=args.repeat))
+        print(f"{name:<16}"
+              f"{single_time / single_loops * 1e6:>14.2f}"
+              f"{len(encode_one(single)):>12}"
+              f"{batch_time * 1e3:>14.2f}"
+              f"{len(encode_many(batch)) / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
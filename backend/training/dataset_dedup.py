@@ -0,0 +1,237 @@
+"""Near-duplicate detection for the Chest X-Ray dataset.
+
+Images are reduced to 64-bit perceptual hashes (pHash) in batches: decoding
+runs on a thread pool and the DCT for a whole batch is a single matrix
+product. Near-duplicates are then found with multi-index hashing: each hash
+is split into ``max_distance + 1`` chunks, and by pigeonhole two hashes
+within ``max_distance`` share at least one chunk exactly, so only hashes in
+the same chunk buckets are ever compared.
+"""
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed for hashing
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow is only needed for hashing
+    Image = None
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+HIGHFREQ_FACTOR = 4
+DEFAULT_MAX_DISTANCE = 4
+
+# When a duplicate group spans splits, the copy in the first split listed
+# here is kept so held-out data is never the copy that gets dropped.
+KEEP_PRIORITY = ("test", "val", "train")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _dct_matrix(n: int):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+def _load_grayscale(path: Path, size: int):
+    try:
+        with Image.open(path) as img:
+            return np.asarray(img.convert("L").resize((size, size), Image.LANCZOS), dtype=np.float32)
+    except (OSError, ValueError):
+        return None
+
+
+def phash_pixels(stack) -> List[int]:
+    """Return the pHash of each grayscale image in ``stack``.
+
+    ``stack`` has shape ``(n, size, size)`` with ``size = HASH_SIZE *
+    HIGHFREQ_FACTOR``. Bit 63 of each hash is the DC coefficient, followed
+    by the rest of the low-frequency block in row-major order.
+    """
+    size = HASH_SIZE * HIGHFREQ_FACTOR
+    dct = _dct_matrix(size)
+    # 2-D DCT of every image in the batch at once: D @ X @ D.T
+    coeffs = dct @ np.asarray(stack, dtype=np.float32) @ dct.T
+    low = coeffs[:, :HASH_SIZE, :HASH_SIZE].reshape(len(coeffs), -1)
+    bits = low > np.median(low, axis=1, keepdims=True)
+    return [int(v) for v in np.packbits(bits, axis=1).view(">u8").ravel()]
+
+
+def compute_phashes(paths: Sequence[Path], batch_size: int = 512, workers: int = 8) -> List[Optional[int]]:
+    """Return a 64-bit pHash per path (``None`` for unreadable images)."""
+    if np is None or Image is None:
+        raise RuntimeError("numpy and Pillow are required. Run `pip install numpy Pillow`.")
+
+    size = HASH_SIZE * HIGHFREQ_FACTOR
+    hashes: List[Optional[int]] = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(paths), batch_size):
+            pixels = list(pool.map(lambda p: _load_grayscale(Path(p), size), paths[start:start + batch_size]))
+            readable = [i for i, px in enumerate(pixels) if px is not None]
+            batch_hashes: List[Optional[int]] = [None] * len(pixels)
+            if readable:
+                packed = phash_pixels(np.stack([pixels[i] for i in readable]))
+                for i, value in zip(readable, packed):
+                    batch_hashes[i] = value
+            hashes.extend(batch_hashes)
+    return hashes
+
+
+class MultiIndexHash:
+    """Exact-match chunk tables for Hamming-radius search over 64-bit hashes.
+
+    The hash is cut into ``radius + 1`` contiguous chunks with one dict per
+    chunk. Any hash within ``radius`` of a query matches it exactly on at
+    least one chunk, so only items sharing a bucket are verified with
+    ``hamming``. ``candidates`` counts those verifications.
+    """
+
+    def __init__(self, radius: int, bits: int = HASH_BITS):
+        if not 0 <= radius < bits:
+            raise ValueError(f"radius must be in [0, {bits})")
+        self.radius = radius
+        chunks = radius + 1
+        bounds = [bits * i // chunks for i in range(chunks + 1)]
+        self._chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self._tables: List[Dict[int, List[int]]] = [defaultdict(list) for _ in self._chunks]
+        self._values: List[int] = []
+        self._items: List[Any] = []
+        self.candidates = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, value: int, item: Any) -> None:
+        index = len(self._items)
+        self._values.append(value)
+        self._items.append(item)
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table[(value >> shift) & mask].append(index)
+
+    def search(self, value: int) -> List[Tuple[int, Any]]:
+        """Return ``(distance, item)`` for every item within ``radius``."""
+        seen = set()
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            bucket = table.get((value >> shift) & mask)
+            if bucket:
+                seen.update(bucket)
+        self.candidates += len(seen)
+        matches = []
+        for index in seen:
+            distance = hamming(value, self._values[index])
+            if distance <= self.radius:
+                matches.append((distance, self._items[index]))
+        return matches
+
+
+def find_near_duplicates(hashes: Iterable[Tuple[Any, int]], max_distance: int = DEFAULT_MAX_DISTANCE,
+                         index: Optional[MultiIndexHash] = None) -> List[Tuple[Any, Any, int]]:
+    """Return ``(earlier, later, distance)`` for every pair within ``max_distance``.
+
+    Each item is queried against the items added before it, so every pair
+    is reported exactly once. Pass ``index`` to inspect its counters.
+    """
+    index = index if index is not None else MultiIndexHash(max_distance)
+    pairs = []
+    for item, value in hashes:
+        for distance, other in index.search(value):
+            pairs.append((other, item, distance))
+        index.add(value, item)
+    return pairs
+
+
+def group_duplicates(pairs: Iterable[Tuple[Any, Any, int]]) -> List[List[Any]]:
+    """Merge duplicate pairs into connected groups (union-find)."""
+    parent: Dict[Any, Any] = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b, _ in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    groups = defaultdict(list)
+    for item in parent:
+        groups[find(item)].append(item)
+    return [sorted(members) for members in groups.values()]
+
+
+def split_leakage(pairs: Iterable[Tuple[Any, Any, int]], split_of: Dict[Any, str]) -> Dict[str, List[Tuple[Any, Any, int]]]:
+    """Bucket cross-split pairs by split pair, e.g. ``{"test/train": [...]}``."""
+    leaks = defaultdict(list)
+    for a, b, distance in pairs:
+        split_a, split_b = split_of[a], split_of[b]
+        if split_a != split_b:
+            leaks["/".join(sorted((split_a, split_b)))].append((a, b, distance))
+    return dict(leaks)
+
+
+def build_clean_manifest(entries: List[Dict[str, str]], groups: List[List[str]],
+                         keep_priority: Sequence[str] = KEEP_PRIORITY) -> Dict[str, Any]:
+    """Keep one image per duplicate group and list the rest as removed.
+
+    ``entries`` are ``{"path", "split", "label"}`` dicts as returned by
+    ``PneumoniaDataLoader.scan_images``.
+    """
+    by_path = {e["path"]: e for e in entries}
+    rank = {split: i for i, split in enumerate(keep_priority)}
+    removed = []
+    for group in groups:
+        keep = min(group, key=lambda p: (rank.get(by_path[p]["split"], len(rank)), p))
+        removed.extend({"path": p, "duplicate_of": keep} for p in group if p != keep)
+
+    dropped = {r["path"] for r in removed}
+    splits: Dict[str, Dict[str, List[str]]] = {}
+    for entry in entries:
+        if entry["path"] not in dropped:
+            splits.setdefault(entry["split"], {}).setdefault(entry["label"], []).append(entry["path"])
+
+    return {
+        "generated": datetime.utcnow().isoformat(),
+        "splits": splits,
+        "removed": removed,
+    }
+
+
+def deduplicate(entries: List[Dict[str, str]], root: Path, max_distance: int = DEFAULT_MAX_DISTANCE,
+                batch_size: int = 512) -> Dict[str, Any]:
+    """Hash ``entries`` (paths relative to ``root``) and report duplicates and leakage."""
+    # Built first so an invalid max_distance fails before any image is hashed
+    index = MultiIndexHash(max_distance)
+    hashes = compute_phashes([root / e["path"] for e in entries], batch_size=batch_size)
+    hashed = [(e["path"], h) for e, h in zip(entries, hashes) if h is not None]
+    pairs = find_near_duplicates(hashed, max_distance=max_distance, index=index)
+    return {
+        "hashed": len(hashed),
+        "unreadable": [e["path"] for e, h in zip(entries, hashes) if h is None],
+        "pairs": pairs,
+        "groups": group_duplicates(pairs),
+        "leakage": split_leakage(pairs, {e["path"]: e["split"] for e in entries}),
+    }
+
+
+def write_manifest(manifest: Dict[str, Any], path: Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest, indent=2))
+    return path
@@ -181,10 +181,82 @@ def verify_dataset_integrity(download_dir: Path):
     return all_good
 
 
-def main():
+def dedupe_dataset(download_dir: Path, max_distance: int = 4, manifest_path: Path = None):
+    """Report near-duplicate images and cross-split leakage.
+
+    If `manifest_path` is given, a cleaned split manifest keeping one image
+    per duplicate group is written there for `PneumoniaDataLoader`.
+    """
+    from dataset_dedup import build_clean_manifest, deduplicate, write_manifest
+    from pneumonia_data_loader import PneumoniaDataLoader
+
+    print("\n🔍 Searching for near-duplicate images...")
+    entries = PneumoniaDataLoader(raw_dir=str(download_dir)).scan_images()
+    if not entries:
+        print(f"ℹ️  No images found under {download_dir}. Nothing to deduplicate.")
+        return None
+
+    report = deduplicate(entries, download_dir, max_distance=max_distance)
+    duplicates = sum(len(g) - 1 for g in report["groups"])
+    print(f"✅ Hashed {report['hashed']} images ({len(report['unreadable'])} unreadable)")
+    print(f"📊 {len(report['groups'])} duplicate groups, {duplicates} redundant images (distance <= {max_distance})")
+
+    if report["leakage"]:
+        print("⚠️  Cross-split leakage:")
+        for splits, pairs in sorted(report["leakage"].items()):
+            print(f"  {splits}: {len(pairs)} pairs")
+            for a, b, distance in pairs[:3]:
+                print(f"    {a} ~ {b} (distance {distance})")
+    else:
+        print("🎉 No leakage between splits")
+
+    if manifest_path is not None:
+        manifest = build_clean_manifest(entries, report["groups"])
+        manifest["max_distance"] = max_distance
+        write_manifest(manifest, manifest_path)
+        print(f"📝 Clean split manifest written to {manifest_path} ({len(manifest['removed'])} images removed)")
+
+    return report
+
+
+# pHashes are 64-bit, so 63 is the largest meaningful distance. Past about
+# 10 unrelated images start to match and the multi-index search degrades
+# towards pairwise comparison.
+MAX_HASH_DISTANCE = 63
+RECOMMENDED_MAX_DISTANCE = 10
+
+
+def max_distance_arg(value):
+    """argparse type for `--max-distance`: an int in [0, MAX_HASH_DISTANCE]."""
+    try:
+        distance = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if not 0 <= distance <= MAX_HASH_DISTANCE:
+        raise argparse.ArgumentTypeError(f"must be between 0 and {MAX_HASH_DISTANCE}, got {distance}")
+    return distance
+
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Chest X-Ray Pneumonia dataset helper")
     parser.add_argument("--download", action="store_true", help="Download the dataset (off by default)")
-    args = parser.parse_args()
+    parser.add_argument("--dedup", action="store_true", help="Find near-duplicate images and cross-split leakage")
+    parser.add_argument("--max-distance", type=max_distance_arg, default=4,
+                        help=f"Largest pHash Hamming distance treated as a duplicate (0-{MAX_HASH_DISTANCE})")
+    parser.add_argument("--write-clean-manifest", metavar="PATH", nargs="?", const="data/splits/clean_manifest.json",
+                        help="With --dedup, write a cleaned split manifest for the loader")
+    args = parser.parse_args(argv)
+
+    if args.write_clean_manifest and not args.dedup:
+        parser.error("--write-clean-manifest requires --dedup")
+    if args.dedup and args.max_distance > RECOMMENDED_MAX_DISTANCE:
+        print(f"⚠️  --max-distance {args.max_distance} is above {RECOMMENDED_MAX_DISTANCE}: "
+              "expect false matches and a much slower search")
+    return args
+
+
+def main():
+    args = parse_args()
 
     print("🚀 Chest X-Ray Pneumonia Dataset Setup")
     print("=" * 50)
@@ -195,6 +267,10 @@ def main():
     download_dir = Path("data/raw")
     verify_dataset_integrity(download_dir)
 
+    if args.dedup:
+        manifest_path = Path(args.write_clean_manifest) if args.write_clean_manifest else None
+        dedupe_dataset(download_dir, max_distance=args.max_distance, manifest_path=manifest_path)
+
     print("\n✅ Setup completed! You can now run the training pipeline.")
     print("💡 Next step: python training/train_pneumonia.py")
 
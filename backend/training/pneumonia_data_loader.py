@@ -4,13 +4,25 @@ This file provides a minimal implementation to allow end-to-end
 dry-runs and unit tests. Replace with production-ready data loading
 and augmentation later.
 """
+import json
+import random
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+IMAGE_EXTENSIONS = {'.jpeg', '.jpg', '.png'}
+SPLITS = ("train", "val", "test")
+CLASSES = ("NORMAL", "PNEUMONIA")
 
 
 class PneumoniaDataLoader:
-    def __init__(self, raw_dir: str = "data/raw"):
+    def __init__(self, raw_dir: str = "data/raw", manifest_path: str = "data/splits/manifest.json",
+                 split_manifest_path: Optional[str] = None):
         self.raw_dir = Path(raw_dir)
+        self.manifest_path = Path(manifest_path)
+        # Optional cleaned split manifest written by `download_dataset.py --dedup`
+        self.split_manifest_path = Path(split_manifest_path) if split_manifest_path else None
+        self._excluded = None
 
     def load_metadata(self) -> Dict[str, Any]:
         """Return a minimal metadata structure describing the dataset.
@@ -51,6 +63,95 @@ class PneumoniaDataLoader:
         }
         return generators
 
+    def scan_images(self, splits=SPLITS) -> List[Dict[str, str]]:
+        """List labelled images under ``raw_dir/chest_xray/<split>/<class>/``.
+
+        Paths are relative to ``raw_dir`` so the manifest survives moving
+        the data directory. Images the cleaned split manifest marks as
+        duplicates are skipped.
+        """
+        excluded = self.excluded_images()
+        entries = []
+        for split in splits:
+            for label in CLASSES:
+                class_dir = self.raw_dir / "chest_xray" / split / label
+                if not class_dir.exists():
+                    continue
+                for f in sorted(class_dir.iterdir()):
+                    path = f.relative_to(self.raw_dir).as_posix()
+                    if f.suffix.lower() in IMAGE_EXTENSIONS and path not in excluded:
+                        entries.append({"path": path, "split": split, "label": label})
+        return entries
+
+    def excluded_images(self) -> set:
+        """Return the duplicate paths removed by the cleaned split manifest, if any."""
+        if self._excluded is None:
+            self._excluded = set()
+            if self.split_manifest_path is not None and self.split_manifest_path.exists():
+                manifest = json.loads(self.split_manifest_path.read_text())
+                self._excluded = {r["path"] for r in manifest.get("removed", [])}
+        return self._excluded
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """Return the dataset manifest, or an empty one if none was written yet.
+
+        ``images`` maps each image path to its split, label and the training
+        run that first used it.
+        """
+        if self.manifest_path.exists():
+            return json.loads(self.manifest_path.read_text())
+        return {"runs": 0, "last_run": None, "images": {}}
+
+    def save_manifest(self, manifest: Dict[str, Any]) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    def find_new_images(self, manifest: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Return training images added since the manifest was last updated."""
+        seen = manifest.get("images", {})
+        return [e for e in self.scan_images(splits=("train",)) if e["path"] not in seen]
+
+    def update_manifest(self, manifest: Dict[str, Any], entries: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Record ``entries`` as used by a new training run."""
+        run = manifest.get("runs", 0) + 1
+        images = manifest.setdefault("images", {})
+        for entry in entries:
+            images.setdefault(entry["path"], {"split": entry["split"], "label": entry["label"], "run": run})
+        manifest["runs"] = run
+        manifest["last_run"] = datetime.utcnow().isoformat()
+        return manifest
+
+    def sample_replay_buffer(self, manifest: Dict[str, Any], size: int, seed: Optional[int] = None) -> List[Dict[str, str]]:
+        """Sample at most ``size`` previously trained images to mix with new data.
+
+        Replaying a bounded slice of the original data keeps incremental
+        runs short while limiting catastrophic forgetting.
+        """
+        seen = [
+            {"path": path, "split": info["split"], "label": info["label"]}
+            for path, info in manifest.get("images", {}).items()
+            if info["split"] == "train"
+        ]
+        if len(seen) <= size:
+            return seen
+        return random.Random(seed).sample(seen, size)
+
+    def create_incremental_generator(self, new_entries: List[Dict[str, str]], replay_entries: List[Dict[str, str]],
+                                     batch_size: int = 32, seed: Optional[int] = None) -> List:
+        """Return shuffled ``(paths, labels)`` batches mixing new and replayed images.
+
+        Only the paths are batched here, so the list stays small and can be
+        iterated once per epoch; a full implementation would decode and
+        augment the images lazily while iterating.
+        """
+        entries = list(new_entries) + list(replay_entries)
+        random.Random(seed).shuffle(entries)
+        batches = []
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            batches.append(([e["path"] for e in batch], [CLASSES.index(e["label"]) for e in batch]))
+        return batches
+
 
 if __name__ == "__main__":
     loader = PneumoniaDataLoader()
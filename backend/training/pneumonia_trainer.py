@@ -3,20 +3,32 @@
 This provides minimal training/evaluation methods returning placeholder
 objects so the overall pipeline can be exercised and tested.
 """
+import json
+import shutil
+from contextlib import nullcontext
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
+
+_END_OF_EPOCH = object()
+
+# Metrics the incremental evaluation gate refuses to let regress
+GATE_METRICS = ("test_accuracy", "test_auc", "test_precision", "test_recall")
 
 
 class PneumoniaModelTrainer:
     def __init__(self, model_dir: str = "models/pneumonia"):
         self.model_dir = Path(model_dir)
         self.model_dir.mkdir(parents=True, exist_ok=True)
+        self.registry_path = self.model_dir / "registry.json"
         self.model = None
 
-    def train(self, train_gen, val_gen, epochs: int = 10, use_class_weights: bool = False) -> Tuple[Any, Dict[str, Any]]:
+    def train(self, train_gen, val_gen, epochs: int = 10, use_class_weights: bool = False, profiler=None) -> Tuple[Any, Dict[str, Any]]:
         """Run a tiny placeholder "training" loop and return a fake model and history.
 
         Replace this with your actual model training code (Keras, PyTorch, etc.).
+        If ``profiler`` is given (see ``step_profiler.StepProfiler``) the time
+        spent waiting for data, computing and checkpointing is recorded per step.
         """
         print(f"Starting placeholder training for {epochs} epochs (use_class_weights={use_class_weights})")
         # Placeholder model object
@@ -24,14 +36,48 @@ class PneumoniaModelTrainer:
 
         history = {"loss": [1.0], "val_loss": [1.0], "accuracy": [0.5], "val_accuracy": [0.5]}
 
-        # Simulate saving model files
         best = self.model_dir / "pneumonia_best_model.h5"
         final = self.model_dir / "pneumonia_final_model.h5"
+
+        self._fit(train_gen, epochs, best, profiler)
         best.write_text("placeholder best model")
         final.write_text("placeholder final model")
 
         return self.model, history
 
+    def _fit(self, train_gen, epochs: int, checkpoint: Path, profiler=None) -> None:
+        """Iterate ``train_gen`` for ``epochs``, checkpointing after each epoch."""
+        for epoch in range(epochs):
+            batches = iter(train_gen)
+            step = 0
+            while True:
+                with self._phase(profiler, "data_wait"):
+                    batch = next(batches, _END_OF_EPOCH)
+                if batch is _END_OF_EPOCH:
+                    # Fetching the end-of-epoch sentinel is not a data wait
+                    if profiler is not None:
+                        profiler.discard("data_wait")
+                    break
+                with self._phase(profiler, "compute"):
+                    self._train_step(batch)
+                if profiler is not None:
+                    profiler.end_step(epoch, step)
+                step += 1
+
+            # Simulate saving the best model at the end of each epoch
+            with self._phase(profiler, "checkpoint"):
+                checkpoint.write_text("placeholder checkpoint")
+            if profiler is not None:
+                profiler.end_step(epoch, step)
+
+    def _train_step(self, batch) -> None:
+        """Placeholder for a single optimisation step on ``batch``."""
+        return None
+
+    @staticmethod
+    def _phase(profiler, name: str):
+        return profiler.phase(name) if profiler is not None else nullcontext()
+
     def evaluate_model(self, test_gen) -> Dict[str, float]:
         """Return fake evaluation metrics for the placeholder model."""
         if self.model is None:
@@ -46,6 +92,89 @@ class PneumoniaModelTrainer:
         print("Evaluation results (placeholder):", results)
         return results
 
+    def load_registry(self) -> Dict[str, Any]:
+        if self.registry_path.exists():
+            return json.loads(self.registry_path.read_text())
+        return {"current": None, "history": []}
+
+    def register_model(self, model_path: Path, metrics: Dict[str, float]) -> Dict[str, Any]:
+        """Register ``model_path`` as the new current model version.
+
+        The weights are copied to ``pneumonia_model_v{n}.h5`` so every
+        registry entry keeps pointing at its own file and older versions
+        can be rolled back to.
+        """
+        registry = self.load_registry()
+        previous = registry.get("current")
+        if previous:
+            registry["history"].append(previous)
+        version = (previous["version"] + 1) if previous else 1
+        versioned = self.model_dir / f"pneumonia_model_v{version}.h5"
+        shutil.copyfile(model_path, versioned)
+        registry["current"] = {
+            "path": versioned.name,
+            "version": version,
+            "metrics": metrics,
+            "registered": datetime.utcnow().isoformat(),
+        }
+        self.registry_path.write_text(json.dumps(registry, indent=2))
+        return registry["current"]
+
+    def load_registered_model(self) -> Dict[str, Any]:
+        """Load the current registered model as the starting point for fine-tuning."""
+        current = self.load_registry().get("current")
+        if current is None:
+            raise RuntimeError("No registered model found. Run a full training first.")
+        model_path = self.model_dir / current["path"]
+        if not model_path.exists():
+            raise RuntimeError(f"Registered model file is missing: {model_path}")
+        # Placeholder: a real implementation would load the weights here
+        self.model = {"name": "pneumonia_placeholder_model", "version": current["version"]}
+        return current
+
+    def train_incremental(self, train_gen, eval_gen, epochs: int = 1, tolerance: float = 0.0,
+                          profiler=None) -> Dict[str, Any]:
+        """Fine-tune the registered model on new + replayed data and gate promotion.
+
+        The registered model and the candidate are both evaluated on
+        ``eval_gen`` in this run, and the candidate is only registered if
+        none of ``GATE_METRICS`` drops by more than ``tolerance``. Nothing is
+        promoted if the baseline evaluation lacks any gated metric.
+        """
+        current = self.load_registered_model()
+        print(f"Evaluating registered model v{current['version']} as the baseline")
+        baseline_metrics = self.evaluate_model(eval_gen)
+
+        print(f"Fine-tuning registered model v{current['version']} for {epochs} epochs")
+        candidate = self.model_dir / "pneumonia_candidate_model.h5"
+        self._fit(train_gen, epochs, candidate, profiler)
+        candidate.write_text("placeholder candidate model")
+        candidate_metrics = self.evaluate_model(eval_gen)
+
+        missing = [name for name in GATE_METRICS if name not in baseline_metrics]
+        regressions = {
+            name: (baseline_metrics[name], candidate_metrics.get(name, 0.0))
+            for name in GATE_METRICS
+            if name in baseline_metrics and candidate_metrics.get(name, 0.0) < baseline_metrics[name] - tolerance
+        }
+
+        promoted = not missing and not regressions
+        registered: Optional[Dict[str, Any]] = None
+        if promoted:
+            registered = self.register_model(candidate, candidate_metrics)
+        else:
+            # Keep serving the registered model
+            self.load_registered_model()
+
+        return {
+            "promoted": promoted,
+            "candidate_path": str(candidate),
+            "candidate_metrics": candidate_metrics,
+            "baseline_metrics": baseline_metrics,
+            "missing_metrics": missing,
+            "regressions": regressions,
+            "registered": registered,
+        }
 
 if __name__ == "__main__":
     trainer = PneumoniaModelTrainer()
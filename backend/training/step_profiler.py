@@ -0,0 +1,70 @@
+"""Per-step timing for the training loop.
+
+``PneumoniaModelTrainer.train`` accepts an optional ``profiler``. When it is
+``None`` the trainer never touches this module, so profiling costs nothing
+unless ``train_pneumonia.py --profile`` is used.
+"""
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List
+
+PHASES = ("data_wait", "compute", "checkpoint")
+
+
+class StepProfiler:
+    """Accumulate wall-clock time per phase for every training step."""
+
+    def __init__(self):
+        self.steps: List[Dict[str, Any]] = []
+        self._current: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._current[name] = self._current.get(name, 0.0) + time.perf_counter() - start
+
+    def discard(self, name: str) -> None:
+        """Drop the time recorded for ``name`` in the current step."""
+        self._current.pop(name, None)
+
+    def end_step(self, epoch: int, step: int) -> None:
+        # Only phases that actually ran are stored, so a checkpoint-only
+        # record does not drag down the compute and data_wait averages.
+        record = {"epoch": epoch, "step": step}
+        record.update(self._current)
+        self.steps.append(record)
+        self._current = {}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return total, mean and max seconds per phase.
+
+        Means are taken over the records in which the phase ran, e.g. the
+        checkpoint mean is per checkpoint, not per training step.
+        """
+        summary = {}
+        for name in PHASES:
+            values = [s[name] for s in self.steps if name in s]
+            summary[name] = {
+                "count": len(values),
+                "total": sum(values),
+                "mean": sum(values) / len(values) if values else 0.0,
+                "max": max(values) if values else 0.0,
+            }
+        return summary
+
+    def save(self, path: str) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"summary": self.summary(), "steps": self.steps}, indent=2))
+        return path
+
+    def print_summary(self) -> None:
+        print("⏱️  Step timing summary:")
+        for name, stats in self.summary().items():
+            print(f"  {name}: n={stats['count']} total={stats['total']:.4f}s "
+                  f"mean={stats['mean']:.4f}s max={stats['max']:.4f}s")
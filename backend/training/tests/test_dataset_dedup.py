@@ -0,0 +1,169 @@
+import contextlib
+import io
+import json
+import random
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from backend.training import dataset_dedup
+from backend.training.dataset_dedup import (
+    MultiIndexHash,
+    build_clean_manifest,
+    find_near_duplicates,
+    group_duplicates,
+    hamming,
+    split_leakage,
+)
+from backend.training.download_dataset import parse_args
+from backend.training.pneumonia_data_loader import PneumoniaDataLoader
+
+
+class DuplicateSearchTests(unittest.TestCase):
+    def test_multi_index_matches_brute_force(self):
+        rng = random.Random(0)
+        values = [rng.getrandbits(64) for _ in range(300)]
+        # plant near-duplicates at every distance up to and just past the radius
+        for flips in range(1, 6):
+            for v in values[:10]:
+                for bit in rng.sample(range(64), flips):
+                    v ^= 1 << bit
+                values.append(v)
+        index = MultiIndexHash(radius=4)
+        for i, v in enumerate(values):
+            index.add(v, i)
+
+        for query in values[:10]:
+            expected = sorted(i for i, v in enumerate(values) if hamming(v, query) <= 4)
+            self.assertEqual(sorted(i for _, i in index.search(query)), expected)
+        self.assertEqual(len(index), len(values))
+
+    def test_search_scales_to_50k_hashes(self):
+        rng = random.Random(1)
+        hashes = [(i, rng.getrandbits(64)) for i in range(50000)]
+        planted = [(50000 + i, value ^ (1 << (i % 64)) ^ (1 << ((i + 7) % 64)))
+                   for i, (_, value) in enumerate(hashes[:500])]
+
+        index = MultiIndexHash(radius=4)
+        started = time.perf_counter()
+        pairs = find_near_duplicates(hashes + planted, max_distance=4, index=index)
+        elapsed = time.perf_counter() - started
+
+        self.assertGreaterEqual(len(pairs), len(planted))
+        # A pairwise search would verify ~1.3 billion candidates
+        self.assertLess(index.candidates, 2000000)
+        self.assertLess(elapsed, 15.0)
+
+    def test_pairs_groups_and_leakage(self):
+        hashes = [("a", 0b0000), ("b", 0b0001), ("c", 0b0011), ("d", 0b11110000)]
+        pairs = find_near_duplicates(hashes, max_distance=1)
+        self.assertEqual(sorted((a, b) for a, b, _ in pairs), [("a", "b"), ("b", "c")])
+        self.assertEqual(group_duplicates(pairs), [["a", "b", "c"]])
+
+        leaks = split_leakage(pairs, {"a": "train", "b": "test", "c": "test", "d": "val"})
+        self.assertEqual(list(leaks), ["test/train"])
+        self.assertEqual(len(leaks["test/train"]), 1)
+
+    def test_clean_manifest_keeps_held_out_copy(self):
+        entries = [
+            {"path": "chest_xray/train/NORMAL/a.jpeg", "split": "train", "label": "NORMAL"},
+            {"path": "chest_xray/test/NORMAL/b.jpeg", "split": "test", "label": "NORMAL"},
+            {"path": "chest_xray/train/NORMAL/c.jpeg", "split": "train", "label": "NORMAL"},
+        ]
+        groups = [["chest_xray/test/NORMAL/b.jpeg", "chest_xray/train/NORMAL/a.jpeg"]]
+        manifest = build_clean_manifest(entries, groups)
+        self.assertEqual(manifest["removed"], [
+            {"path": "chest_xray/train/NORMAL/a.jpeg", "duplicate_of": "chest_xray/test/NORMAL/b.jpeg"}
+        ])
+        self.assertEqual(manifest["splits"]["train"]["NORMAL"], ["chest_xray/train/NORMAL/c.jpeg"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            class_dir = Path(tmp) / "chest_xray" / "train" / "NORMAL"
+            class_dir.mkdir(parents=True)
+            for name in ("a.jpeg", "c.jpeg"):
+                (class_dir / name).write_bytes(b"")
+            manifest_path = Path(tmp) / "clean.json"
+            manifest_path.write_text(json.dumps(manifest))
+            loader = PneumoniaDataLoader(raw_dir=tmp, split_manifest_path=str(manifest_path))
+            self.assertEqual([e["path"] for e in loader.scan_images()], ["chest_xray/train/NORMAL/c.jpeg"])
+
+
+class DedupCommandLineTests(unittest.TestCase):
+    def _parse(self, argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                return parse_args(argv), out.getvalue()
+            except SystemExit:
+                return None, err.getvalue()
+
+    def test_max_distance_range_is_checked_up_front(self):
+        for value in ("-1", "64", "four"):
+            args, error = self._parse(["--dedup", "--max-distance", value])
+            self.assertIsNone(args)
+            self.assertIn("--max-distance", error)
+        args, _ = self._parse(["--dedup", "--max-distance", "63"])
+        self.assertEqual(args.max_distance, 63)
+        with self.assertRaises(ValueError):
+            dataset_dedup.deduplicate([{"path": "a.jpeg", "split": "train", "label": "NORMAL"}],
+                                      Path("."), max_distance=64)
+
+    def test_large_distance_warns(self):
+        _, output = self._parse(["--dedup", "--max-distance", "12"])
+        self.assertIn("above 10", output)
+        _, output = self._parse(["--dedup"])
+        self.assertEqual(output, "")
+
+    def test_clean_manifest_requires_dedup(self):
+        args, error = self._parse(["--write-clean-manifest"])
+        self.assertIsNone(args)
+        self.assertIn("requires --dedup", error)
+        args, _ = self._parse(["--dedup", "--write-clean-manifest"])
+        self.assertEqual(args.write_clean_manifest, "data/splits/clean_manifest.json")
+
+
+@unittest.skipUnless(dataset_dedup.np is not None and dataset_dedup.Image is not None, "numpy and Pillow required")
+class PerceptualHashTests(unittest.TestCase):
+    def test_hash_bits_follow_low_frequency_signs(self):
+        np = dataset_dedup.np
+        size = dataset_dedup.HASH_SIZE * dataset_dedup.HIGHFREQ_FACTOR
+        dct = dataset_dedup._dct_matrix(size)
+        np.testing.assert_allclose(dct @ dct.T, np.eye(size), atol=1e-5)
+
+        # Build an image from known DCT coefficients: 32 positive and 32
+        # negative low-frequency terms, so the median sits between them.
+        rng = np.random.default_rng(0)
+        signs = rng.permutation([1.0] * 32 + [-1.0] * 32).reshape(8, 8)
+        coeffs = np.zeros((size, size), dtype=np.float32)
+        coeffs[:8, :8] = signs * 10.0
+        pixels = dct.T @ coeffs @ dct
+
+        expected = int("".join("1" if v > 0 else "0" for v in signs.ravel()), 2)
+        self.assertEqual(dataset_dedup.phash_pixels(pixels[None]), [expected])
+
+    def test_near_duplicates_hash_close_and_distinct_images_far(self):
+        np = dataset_dedup.np
+        Image = dataset_dedup.Image
+        rng = np.random.default_rng(0)
+        base = (rng.random((128, 128)) * 255).astype(np.uint8)
+        other = (rng.random((128, 128)) * 255).astype(np.uint8)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [Path(tmp) / name for name in ("base.png", "brighter.png", "broken.png", "other.png")]
+            Image.fromarray(base).save(paths[0])
+            Image.fromarray(np.clip(base.astype(int) + 10, 0, 255).astype(np.uint8)).save(paths[1])
+            paths[2].write_bytes(b"not an image")
+            Image.fromarray(other).save(paths[3])
+
+            # batch_size=3 puts the unreadable file in the middle of a batch
+            hashes = dataset_dedup.compute_phashes(paths, batch_size=3, workers=2)
+
+        self.assertIsNone(hashes[2])
+        self.assertTrue(all(0 <= h < 1 << 64 for h in (hashes[0], hashes[1], hashes[3])))
+        self.assertLessEqual(hamming(hashes[0], hashes[1]), 4)
+        self.assertGreater(hamming(hashes[0], hashes[3]), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
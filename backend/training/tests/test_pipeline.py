@@ -1,9 +1,11 @@
 import unittest
 import os
+import tempfile
 from pathlib import Path
 
 from backend.training.pneumonia_data_loader import PneumoniaDataLoader
 from backend.training.pneumonia_trainer import PneumoniaModelTrainer
+from backend.training.step_profiler import PHASES, StepProfiler
 
 
 class PipelineSkeletonTests(unittest.TestCase):
@@ -41,6 +43,108 @@ class PipelineSkeletonTests(unittest.TestCase):
         self.assertIsInstance(results, dict)
         self.assertIn('test_accuracy', results)
 
+    def test_trainer_records_step_timings_when_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            trainer = PneumoniaModelTrainer(model_dir=tmp)
+            profiler = StepProfiler()
+            trainer.train([(None, None)] * 3, [], epochs=2, profiler=profiler)
+            # 3 batch steps plus one checkpoint step per epoch
+            self.assertEqual(len(profiler.steps), 8)
+            self.assertGreater(profiler.steps[3]["checkpoint"], 0.0)
+            summary = profiler.summary()
+            self.assertEqual(set(summary), set(PHASES))
+            # Checkpoints are averaged per checkpoint, compute per batch step
+            self.assertEqual(summary["checkpoint"]["count"], 2)
+            self.assertEqual(summary["compute"]["count"], 6)
+            self.assertEqual(summary["data_wait"]["count"], 6)
+            self.assertEqual(set(profiler.steps[3]), {"epoch", "step", "checkpoint"})
+            self.assertAlmostEqual(summary["checkpoint"]["mean"], summary["checkpoint"]["total"] / 2)
+            saved = profiler.save(os.path.join(tmp, "profile.json"))
+            self.assertTrue(saved.exists())
+
+
+class IncrementalTrainingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.raw_dir = self.root / "raw"
+        self.loader = PneumoniaDataLoader(raw_dir=str(self.raw_dir),
+                                          manifest_path=str(self.root / "manifest.json"))
+        self.trainer = PneumoniaModelTrainer(model_dir=str(self.root / "models"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _add_images(self, label, names):
+        class_dir = self.raw_dir / "chest_xray" / "train" / label
+        class_dir.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            (class_dir / name).write_bytes(b"")
+
+    def _full_run(self):
+        self.trainer.train([], [], epochs=1)
+        metrics = self.trainer.evaluate_model([])
+        self.trainer.register_model(self.trainer.model_dir / "pneumonia_best_model.h5", metrics)
+        manifest = self.loader.update_manifest(self.loader.load_manifest(), self.loader.scan_images(("train",)))
+        self.loader.save_manifest(manifest)
+
+    def test_manifest_tracks_new_images_and_bounds_replay(self):
+        self._add_images("NORMAL", [f"n{i}.jpeg" for i in range(10)])
+        self._full_run()
+        manifest = self.loader.load_manifest()
+        self.assertEqual(self.loader.find_new_images(manifest), [])
+
+        self._add_images("PNEUMONIA", ["p_new.jpeg", "notes.txt"])
+        new = self.loader.find_new_images(manifest)
+        self.assertEqual([e["path"] for e in new], ["chest_xray/train/PNEUMONIA/p_new.jpeg"])
+
+        replay = self.loader.sample_replay_buffer(manifest, size=4, seed=0)
+        self.assertEqual(len(replay), 4)
+        batches = self.loader.create_incremental_generator(new, replay, batch_size=2)
+        self.assertEqual(sum(len(paths) for paths, _ in batches), 5)
+
+    def test_incremental_candidate_promoted_to_its_own_version(self):
+        self._full_run()
+        v1 = self.trainer.model_dir / "pneumonia_model_v1.h5"
+        v1_contents = v1.read_text()
+
+        outcome = self.trainer.train_incremental([(["a"], [0])], [], epochs=1)
+        self.assertTrue(outcome["promoted"])
+        registry = self.trainer.load_registry()
+        self.assertEqual(registry["current"]["version"], 2)
+        self.assertEqual(registry["current"]["path"], "pneumonia_model_v2.h5")
+        self.assertEqual(registry["history"][0]["path"], "pneumonia_model_v1.h5")
+        # The previous version is still available for rollback
+        self.assertEqual(v1.read_text(), v1_contents)
+        self.assertTrue((self.trainer.model_dir / "pneumonia_model_v2.h5").exists())
+
+    def _evaluations(self, *results):
+        calls = iter(results)
+        self.trainer.evaluate_model = lambda gen: next(calls)
+
+    def test_incremental_candidate_rejected_on_regression(self):
+        self._full_run()
+        metrics = {"test_accuracy": 0.9, "test_auc": 0.9, "test_precision": 0.9, "test_recall": 0.9}
+        # Baseline is scored in the same run, not taken from the registry
+        self._evaluations(metrics, dict(metrics, test_accuracy=0.85))
+        outcome = self.trainer.train_incremental([(["a"], [0])], [], epochs=1)
+        self.assertFalse(outcome["promoted"])
+        self.assertEqual(outcome["baseline_metrics"], metrics)
+        self.assertEqual(outcome["regressions"], {"test_accuracy": (0.9, 0.85)})
+        self.assertEqual(self.trainer.load_registry()["current"]["version"], 1)
+
+    def test_incremental_refuses_promotion_without_baseline_metrics(self):
+        self._full_run()
+        self._evaluations({}, {"test_accuracy": 1.0})
+        outcome = self.trainer.train_incremental([(["a"], [0])], [], epochs=1)
+        self.assertFalse(outcome["promoted"])
+        self.assertIn("test_auc", outcome["missing_metrics"])
+        self.assertEqual(self.trainer.load_registry()["current"]["version"], 1)
+
+    def test_incremental_requires_registered_model(self):
+        with self.assertRaises(RuntimeError):
+            self.trainer.train_incremental([], [])
+
 
 if __name__ == '__main__':
     unittest.main()
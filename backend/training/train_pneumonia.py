@@ -4,6 +4,7 @@ Main training script for Chest X-Ray Pneumonia dataset
 With automatic Kaggle dataset download
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -13,6 +14,7 @@ sys.path.append(os.path.dirname(__file__))
 
 from pneumonia_data_loader import PneumoniaDataLoader
 from pneumonia_trainer import PneumoniaModelTrainer
+from step_profiler import StepProfiler
 
 def setup_environment():
     """Setup the training environment"""
@@ -49,8 +51,55 @@ def check_dataset():
             print(f"❌ Failed to download dataset: {e}")
             return False
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chest X-Ray Pneumonia training pipeline")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-step data wait / compute / checkpoint timings to logs/")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fine-tune the registered model on images added since the last run")
+    parser.add_argument("--replay-size", type=int, default=1000,
+                        help="Previously seen images mixed into an incremental run")
+    parser.add_argument("--incremental-epochs", type=int, default=2,
+                        help="Epochs for an incremental run")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="Largest metric drop allowed when promoting an incremental candidate")
+    return parser.parse_args(argv)
+
+def run_incremental(args, data_loader, trainer, eval_gen, profiler=None):
+    """Fine-tune on new images plus a replay buffer and promote if metrics hold"""
+    manifest = data_loader.load_manifest()
+    new_images = data_loader.find_new_images(manifest)
+    if not new_images:
+        print("✅ No new labelled images since the last run, nothing to do.")
+        return None
+
+    replay = data_loader.sample_replay_buffer(manifest, args.replay_size)
+    print(f"🔁 Incremental run: {len(new_images)} new images + {len(replay)} replayed")
+    batches = data_loader.create_incremental_generator(new_images, replay, batch_size=32)
+
+    outcome = trainer.train_incremental(
+        batches,
+        eval_gen,
+        epochs=args.incremental_epochs,
+        tolerance=args.tolerance,
+        profiler=profiler
+    )
+
+    if outcome["promoted"]:
+        # Only mark images as seen once a model trained on them is live
+        data_loader.save_manifest(data_loader.update_manifest(manifest, new_images))
+        print(f"🏆 Candidate promoted to v{outcome['registered']['version']}")
+    elif outcome["missing_metrics"]:
+        print(f"⚠️  Candidate rejected, baseline evaluation lacks: {', '.join(outcome['missing_metrics'])}")
+    else:
+        print("⚠️  Candidate rejected, metrics regressed:")
+        for name, (before, after) in outcome["regressions"].items():
+            print(f"   {name}: {before:.4f} -> {after:.4f}")
+    return outcome
+
+def main(argv=None):
     """Main training function for pneumonia dataset"""
+    args = parse_args(argv)
     print("🚀 Chest X-Ray Pneumonia Model Training Pipeline")
     print("=" * 60)
     
@@ -65,7 +114,8 @@ def main():
         return
     
     # Initialize data loader
-    data_loader = PneumoniaDataLoader()
+    # Honours the cleaned split manifest from `download_dataset.py --dedup` if present
+    data_loader = PneumoniaDataLoader(split_manifest_path="data/splits/clean_manifest.json")
     
     # Load metadata
     print("\n📊 Loading dataset metadata...")
@@ -89,6 +139,15 @@ def main():
     
     # Initialize trainer
     trainer = PneumoniaModelTrainer()
+    profiler = StepProfiler() if args.profile else None
+
+    if args.incremental:
+        eval_gen = generators.get('test', generators['val'])
+        outcome = run_incremental(args, data_loader, trainer, eval_gen, profiler)
+        if profiler is not None:
+            profiler.print_summary()
+            profiler.save("logs/training_profile.json")
+        return outcome
     
     # Train model
     print("\n🎯 Starting model training...")
@@ -97,8 +156,14 @@ def main():
             generators['train'],
             generators['val'],
             epochs=50,
-            use_class_weights=True  # Important for imbalanced dataset
+            use_class_weights=True,  # Important for imbalanced dataset
+            profiler=profiler
         )
+
+        if profiler is not None:
+            profiler.print_summary()
+            profile_path = profiler.save("logs/training_profile.json")
+            print(f"⏱️  Step timings saved to: {profile_path}")
         
         # Evaluate on test set
         if 'test' in generators:
@@ -107,6 +172,13 @@ def main():
         else:
             print("⚠️  No test generator found, skipping evaluation.")
             eval_results = None
+
+        # Register the model and record the images it was trained on so
+        # later --incremental runs only pick up new data
+        registered = trainer.register_model(trainer.model_dir / "pneumonia_best_model.h5", eval_results or {})
+        data_loader.save_manifest(
+            data_loader.update_manifest(data_loader.load_manifest(), data_loader.scan_images(splits=("train",)))
+        )
         
         print("\n" + "="*60)
         print("🎉 TRAINING COMPLETED SUCCESSFULLY!")
@@ -114,6 +186,7 @@ def main():
         print(f"📁 Model saved to: {trainer.model_dir}")
         print(f"🏆 Best model: {trainer.model_dir}/pneumonia_best_model.h5")
         print(f"📦 Final model: {trainer.model_dir}/pneumonia_final_model.h5")
+        print(f"📌 Registered model v{registered['version']}: {trainer.model_dir}/{registered['path']}")
         
         if eval_results:
             print(f"📊 Test Accuracy: {eval_results['test_accuracy']:.4f}")